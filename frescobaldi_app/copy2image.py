@@ -25,9 +25,11 @@ Dialog to copy contents from PDF to a raster image.
 import collections
 import os
 import tempfile
+import weakref
 
-from PyQt5.QtCore import QEvent, QSettings, QSize, Qt
-from PyQt5.QtGui import QBitmap, QColor, QDoubleValidator, QImage, QRegion
+from PyQt5.QtCore import QEvent, QSettings, QSize, Qt, QTimer
+from PyQt5.QtGui import (
+    QBitmap, QColor, QDoubleValidator, QImage, QImageWriter, QRegion)
 from PyQt5.QtWidgets import (
     QApplication, QCheckBox, QComboBox, QDialog, QDialogButtonBox, QFileDialog,
     QGridLayout, QHBoxLayout, QLabel, QMessageBox, QPushButton, QVBoxLayout)
@@ -42,35 +44,85 @@ import qpageview.export
 import widgets.colorbutton
 
 
+# the resolutions to choose from
+_DPI_CHOICES = ('72', '100', '200', '300', '600', '1200')
+
+# Qt maps the quality of a PNG image to the zlib compression level,
+# 85 results in level 1, which is much faster than the default
+_PNG_QUALITY = 85
+
+
+class ImageExporter(qpageview.export.ImageExporter):
+    """An ImageExporter that saves PNG images with faster compression."""
+    def save(self, filename):
+        writer = QImageWriter(filename)
+        if os.path.splitext(filename)[1].lower() == '.png':
+            writer.setQuality(_PNG_QUALITY)
+        if not writer.write(self.image()):
+            raise OSError("Could not save image")
+
+
+# the types that can be exported, with the exporter class to use
+_EXPORT_TYPES = (
+    ('svg', qpageview.export.SvgExporter),
+    ('pdf', qpageview.export.PdfExporter),
+    ('eps', qpageview.export.EpsExporter),
+    ('png', ImageExporter),
+    ('jpg', ImageExporter),
+)
+
+
+# keep one dialog per parent widget
+_dialogs = weakref.WeakKeyDictionary()
+
+
 def copy_image(parent_widget, page, rect=None, filename=None):
     """Shows the dialog to copy a PDF page to a raster image.
 
     If rect is given, only that part of the page is copied.
 
+    The dialog is created once for every parent widget and reused
+    on later calls.
+
     """
-    dlg = Dialog(parent_widget)
-    dlg.show()
+    dlg = _dialogs.get(parent_widget)
+    if dlg is None:
+        dlg = _dialogs[parent_widget] = Dialog(parent_widget)
+    elif not dlg.isVisible():
+        # another dialog may have changed the settings in the meantime;
+        # an open dialog keeps the settings the user chose in it
+        dlg.readSettings()
+    # start rendering before showing, so it runs while the dialog is laid out
     dlg.setPage(page, rect, filename)
-    dlg.finished.connect(dlg.deleteLater)
+    dlg.show()
+    dlg.raise_()
+    dlg.activateWindow()
 
 
 class Dialog(QDialog):
     def __init__(self, parent=None):
         super(Dialog, self).__init__(parent)
         self._filename = None
+        self._sourcePage = None
+        self._sourceGeometry = None
         self._page = None
         self._rect = None
         self._exporter = None
+        self._exportKey = None
+        self._exportRunning = False
+        self._saving = False
         self.runJob = qpageview.backgroundjob.SingleRun()
+        self._updateTimer = QTimer(self, singleShot=True, interval=150,
+                                   timeout=self.updateExport)
         self.imageViewer = qpageview.imageview.ImageView()
         self.typeLabel = QLabel()
         self.typeCombo = QComboBox()
-        self.typeCombo.addItems([''] * len(self.exportTypes()))
+        self.typeCombo.addItems([''] * len(_EXPORT_TYPES))
         self.dpiLabel = QLabel()
         self.dpiCombo = QComboBox(insertPolicy=QComboBox.NoInsert, editable=True)
         self.dpiCombo.lineEdit().setCompleter(None)
         self.dpiCombo.setValidator(QDoubleValidator(10.0, 1200.0, 4, self.dpiCombo))
-        self.dpiCombo.addItems([format(i) for i in (72, 100, 200, 300, 600, 1200)])
+        self.dpiCombo.addItems(_DPI_CHOICES)
 
         self.colorCheck = QCheckBox(checked=False)
         self.colorButton = widgets.colorbutton.ColorButton()
@@ -120,14 +172,15 @@ class Dialog(QDialog):
         app.translateUI(self)
         self.readSettings()
         self.finished.connect(self.writeSettings)
+        self.finished.connect(self.clearExport)
         self.typeCombo.currentIndexChanged.connect(self.updateExport)
-        self.dpiCombo.editTextChanged.connect(self.updateExport)
-        self.colorCheck.toggled.connect(self.updateExport)
-        self.colorButton.colorChanged.connect(self.updateExport)
-        self.grayscale.toggled.connect(self.updateExport)
-        self.scaleup.toggled.connect(self.updateExport)
-        self.crop.toggled.connect(self.updateExport)
-        self.antialias.toggled.connect(self.updateExport)
+        self.dpiCombo.editTextChanged.connect(self.scheduleUpdateExport)
+        self.colorCheck.toggled.connect(self.scheduleUpdateExport)
+        self.colorButton.colorChanged.connect(self.scheduleUpdateExport)
+        self.grayscale.toggled.connect(self.scheduleUpdateExport)
+        self.scaleup.toggled.connect(self.scheduleUpdateExport)
+        self.crop.toggled.connect(self.scheduleUpdateExport)
+        self.antialias.toggled.connect(self.scheduleUpdateExport)
         self.buttons.rejected.connect(self.reject)
         self.copydata.clicked.connect(self.copyDataToClipboard)
         self.copyfile.clicked.connect(self.copyFileToClipboard)
@@ -141,8 +194,10 @@ class Dialog(QDialog):
     def translateUI(self):
         self.setCaption()
         self.typeLabel.setText(_("Type:"))
-        for n, t in enumerate(self.exportTypes()):
-            self.typeCombo.setItemText(n, t[1])
+        self._exportTypeNames = (_("SVG"), _("PDF"), _("EPS"), _("PNG"), _("JPG"))
+        self._fileTypeTexts = {}    # translated tooltips per export type
+        for n, name in enumerate(self._exportTypeNames):
+            self.typeCombo.setItemText(n, name)
         self.dpiLabel.setText(_("DPI:"))
         self.colorCheck.setText(_("Background:"))
         self.colorButton.setToolTip(_("Paper Color"))
@@ -175,36 +230,50 @@ class Dialog(QDialog):
     def updateFileTypeUITexts(self):
         """Update the texts in buttons that carry file type information.
 
-        Called from translateUI() and from updateExport().
+        Called from translateUI() and from updateExport(). The translated
+        texts are cached per export type until the language changes.
 
         """
-        filetype = self.exportTypes()[self.typeCombo.currentIndex()][1]
-        self.dragdata.setToolTip(_("Drag the {png} image data.").format(png=filetype))
-        self.dragfile.setToolTip(_("Drag the image as a {png} file.").format(png=filetype))
-        self.copydata.setToolTip(_("Copy the {png} image data to Clipboard.").format(png=filetype))
-        self.copyfile.setToolTip(_("Copy the {png} file to Clipboard.").format(png=filetype))
+        index = self.typeCombo.currentIndex()
+        try:
+            texts = self._fileTypeTexts[index]
+        except KeyError:
+            filetype = self._exportTypeNames[index]
+            texts = self._fileTypeTexts[index] = (
+                _("Drag the {png} image data.").format(png=filetype),
+                _("Drag the image as a {png} file.").format(png=filetype),
+                _("Copy the {png} image data to Clipboard.").format(png=filetype),
+                _("Copy the {png} file to Clipboard.").format(png=filetype),
+            )
+        for button, text in zip(
+                (self.dragdata, self.dragfile, self.copydata, self.copyfile), texts):
+            button.setToolTip(text)
 
     def readSettings(self):
+        """Read the settings; setPage() must be called afterwards."""
         s = QSettings()
         s.beginGroup('copy_image')
-        exportType = s.value("type", "svg", str)
-        for n, t in enumerate(self.exportTypes()):
-            if t[0] == exportType:
-                self.typeCombo.setCurrentIndex(n)
-                break
-        self.dpiCombo.setEditText(s.value("dpi", "100", str))
-        color = s.value("papercolor", QColor(), QColor)
-        self.colorButton.setColor(color if color.isValid() else Qt.white)
-        self.colorCheck.setChecked(color.isValid())
-        self.grayscale.setChecked(s.value("grayscale", False, bool))
-        self.crop.setChecked(s.value("autocrop", False, bool))
-        self.antialias.setChecked(s.value("antialias", True, bool))
-        self.scaleup.setChecked(s.value("scaleup", False, bool))
+        with qutil.signalsBlocked(self.typeCombo, self.dpiCombo,
+                self.colorCheck, self.colorButton, self.grayscale, self.crop,
+                self.antialias, self.scaleup):
+            exportType = s.value("type", "svg", str)
+            for n, (t, cls) in enumerate(_EXPORT_TYPES):
+                if t == exportType:
+                    self.typeCombo.setCurrentIndex(n)
+                    break
+            self.dpiCombo.setEditText(s.value("dpi", "100", str))
+            color = s.value("papercolor", QColor(), QColor)
+            self.colorButton.setColor(color if color.isValid() else Qt.white)
+            self.colorCheck.setChecked(color.isValid())
+            self.grayscale.setChecked(s.value("grayscale", False, bool))
+            self.crop.setChecked(s.value("autocrop", False, bool))
+            self.antialias.setChecked(s.value("antialias", True, bool))
+            self.scaleup.setChecked(s.value("scaleup", False, bool))
 
     def writeSettings(self):
         s = QSettings()
         s.beginGroup('copy_image')
-        s.setValue("type", self.exportTypes()[self.typeCombo.currentIndex()][0])
+        s.setValue("type", _EXPORT_TYPES[self.typeCombo.currentIndex()][0])
         s.setValue("dpi", self.dpiCombo.currentText())
         color = self.colorButton.color() if self.colorCheck.isChecked() else QColor()
         s.setValue("papercolor", color)
@@ -213,16 +282,6 @@ class Dialog(QDialog):
         s.setValue("antialias", self.antialias.isChecked())
         s.setValue("scaleup", self.scaleup.isChecked())
 
-    def exportTypes(self):
-        """Return the list of types that can be exported and their names."""
-        return [
-            ('svg', _("SVG"), qpageview.export.SvgExporter),
-            ('pdf', _("PDF"), qpageview.export.PdfExporter),
-            ('eps', _("EPS"), qpageview.export.EpsExporter),
-            ('png', _("PNG"), qpageview.export.ImageExporter),
-            ('jpg', _("JPG"), qpageview.export.ImageExporter),
-        ]
-
     def setCaption(self):
         if self._filename:
             filename = os.path.basename(self._filename)
@@ -232,70 +291,144 @@ class Dialog(QDialog):
         self.setWindowTitle(app.caption(title))
 
     def setPage(self, page, rect, filename):
-        page = page.copy()
-        if page.renderer:
-            page.renderer = page.renderer.copy()
-        self._page = page
-        self._rect = rect
+        # only copy the page if it is not the same as last time; the view
+        # changes the size and rotation of a page in place, and the rect
+        # is in those coordinates
+        geometry = (page.width, page.height, page.computedRotation)
+        if (page is not self._sourcePage or rect != self._rect
+                or geometry != self._sourceGeometry):
+            self._sourcePage = page
+            self._sourceGeometry = geometry
+            page = page.copy()
+            if page.renderer:
+                page.renderer = page.renderer.copy()
+            self._page = page
+            self._rect = rect
         self._filename = filename
         self.setCaption()
         self.updateExport()
 
+    def scheduleUpdateExport(self):
+        """Call updateExport() shortly, coalescing quickly repeated changes.
+
+        This prevents e.g. a render for every digit typed in the DPI field.
+        The actions are disabled meanwhile, as they would act on the
+        previous export.
+
+        """
+        self.setActionsEnabled(False)
+        self._updateTimer.start()
+
     def updateExport(self):
-        exportType, name, cls = self.exportTypes()[self.typeCombo.currentIndex()]
+        self._updateTimer.stop()
+        exportType, cls = _EXPORT_TYPES[self.typeCombo.currentIndex()]
+
+        # what the exporter supports
+        res, color, gray, crop, aa, ov = (
+            cls.supportsResolution, cls.supportsPaperColor, cls.supportsGrayscale,
+            cls.supportsAutocrop, cls.supportsAntialiasing, cls.supportsOversample)
+
+        # update the enabled state of buttons
+        self.dpiCombo.setEnabled(res)
+        self.colorCheck.setEnabled(color)
+        self.colorButton.setEnabled(color and self.colorCheck.isChecked())
+        self.grayscale.setEnabled(gray)
+        self.crop.setEnabled(crop)
+        self.antialias.setEnabled(aa)
+        self.scaleup.setEnabled(ov)
+
+        # the effective preferences of the exporter, None if not supported
+        resolution = paperColor = grayscale = antialiasing = autocrop = oversample = None
+        if res:
+            resolution = float(self.dpiCombo.currentText() or '100')
+        if color and self.colorCheck.isChecked():
+            paperColor = self.colorButton.color()
+        if gray:
+            grayscale = self.grayscale.isChecked()
+        if aa:
+            antialiasing = self.antialias.isChecked()
+        if crop:
+            autocrop = self.crop.isChecked()
+        if ov:
+            oversample = 2 if self.scaleup.isChecked() else 1
+
+        # don't render again if nothing changed that affects the result
+        key = (exportType, self._page, self._rect, self._filename, resolution,
+               paperColor, grayscale, antialiasing, autocrop, oversample)
+        if key == self._exportKey:
+            self.setActionsEnabled(not self._exportRunning)
+            return
+        self._exportKey = key
+
         e = self._exporter = cls(self._page, self._rect)
         e.filename = self._filename
         if exportType == "jpg":
             e.defaultExt = ".jpg"
 
-        # update the enabled state of buttons
-        self.dpiCombo.setEnabled(e.supportsResolution)
-        self.colorCheck.setEnabled(e.supportsPaperColor)
-        self.colorButton.setEnabled(e.supportsPaperColor and self.colorCheck.isChecked())
-        self.grayscale.setEnabled(e.supportsGrayscale)
-        self.crop.setEnabled(e.supportsAutocrop)
-        self.antialias.setEnabled(e.supportsAntialiasing)
-        self.scaleup.setEnabled(e.supportsOversample)
-
         # update the preferences of the exporter
-        if e.supportsResolution:
-            e.resolution = float(self.dpiCombo.currentText() or '100')
-        if e.supportsPaperColor and self.colorCheck.isChecked():
-            e.paperColor = self.colorButton.color()
-        if e.supportsGrayscale:
-            e.grayscale = self.grayscale.isChecked()
-        if e.supportsAntialiasing:
-            e.antialiasing = self.antialias.isChecked()
-        if e.supportsAutocrop:
-            e.autocrop = self.crop.isChecked()
-        if e.supportsOversample:
-            e.oversample = 2 if self.scaleup.isChecked() else 1
+        if resolution is not None:
+            e.resolution = resolution
+        if paperColor is not None:
+            e.paperColor = paperColor
+        if grayscale is not None:
+            e.grayscale = grayscale
+        if antialiasing is not None:
+            e.antialiasing = antialiasing
+        if autocrop is not None:
+            e.autocrop = autocrop
+        if oversample is not None:
+            e.oversample = oversample
 
         # disable button actions
-        self.dragfile.setEnabled(False)
-        self.copyfile.setEnabled(False)
-        self.dragdata.setEnabled(False)
-        self.copydata.setEnabled(False)
-        self.saveButton.setEnabled(False)
+        self.setActionsEnabled(False)
 
         # set filetype info in button tooltips
         self.updateFileTypeUITexts()
 
         # run the export job in a background thread
         self.runJob(e.document, self.exportDone)
-        self.setCursor(Qt.WaitCursor)
+        self._exportRunning = True
+        self.updateCursor()
+
+    def clearExport(self):
+        """Cancel a pending or running export and release the exported image.
+
+        Called when the dialog is closed, so that the dialog, which is kept
+        for reuse, does not hold on to a (possibly very large) image, nor to
+        the viewer's page and document.
+
+        """
+        self._updateTimer.stop()
+        if self._exportRunning:
+            self.runJob.cancel()
+            self._exportRunning = False
+            self.updateCursor()
+        self.imageViewer.clear()
+        self._exporter = None
+        self._exportKey = None
+        self._sourcePage = self._sourceGeometry = self._page = self._rect = None
 
     def exportDone(self, document):
-        self.unsetCursor()
+        self._exportRunning = False
+        self.updateCursor()
         self.imageViewer.setDocument(document)
         if self.imageViewer.viewMode() is not qpageview.FitBoth:
             self.imageViewer.zoomNaturalSize()
         # re-enable button actions
-        self.dragfile.setEnabled(True)
-        self.copyfile.setEnabled(True)
-        self.dragdata.setEnabled(True)
-        self.copydata.setEnabled(True)
-        self.saveButton.setEnabled(True)
+        self.setActionsEnabled(True)
+
+    def setActionsEnabled(self, enabled):
+        """Enable or disable the buttons that act on the exported image."""
+        for button in (self.dragfile, self.copyfile, self.dragdata, self.copydata):
+            button.setEnabled(enabled)
+        self.saveButton.setEnabled(enabled and not self._saving)
+
+    def updateCursor(self):
+        """Show the wait cursor while exporting or saving."""
+        if self._exportRunning or self._saving:
+            self.setCursor(Qt.WaitCursor)
+        else:
+            self.unsetCursor()
 
     def copyDataToClipboard(self):
         self._exporter.copyData()
@@ -316,10 +449,25 @@ class Dialog(QDialog):
         filename = QFileDialog.getSaveFileName(self,
             _("Save Image As"), filename)[0]
         if filename:
-            try:
-                self._exporter.save(filename)
-            except OSError:
-                QMessageBox.critical(self, _("Error"), _(
-                    "Could not save the image."))
+            # save in a background thread, encoding a large image takes time
+            exporter = self._exporter
+            def save():
+                try:
+                    exporter.save(filename)
+                except OSError:
+                    return False
+                return True
+            def done(success):
+                self._saving = False
+                self.updateCursor()
+                # the other actions are enabled if an export is available
+                self.saveButton.setEnabled(self.copydata.isEnabled())
+                if not success:
+                    QMessageBox.critical(self, _("Error"), _(
+                        "Could not save the image."))
+            self._saving = True
+            self.saveButton.setEnabled(False)
+            self.updateCursor()
+            qpageview.backgroundjob.run(save, done)
 
 
@@ -35,6 +35,10 @@ line_painter = widgets.folding.LinePainter()
 
 
 class Folder(widgets.folding.Folder):
+    # the tokens of a block can change without the document changing (e.g.
+    # when the mode changes), so the fold level is cached with the tokens
+    cache_fold_levels = False
+
     def fold_events(self, block):
         """Provides folding information by looking at indent/dedent tokens."""
         for t in tokeniter.tokens(block):
@@ -43,6 +47,27 @@ class Folder(widgets.folding.Folder):
             elif isinstance(t, (ly.lex.Dedent, ly.lex.BlockCommentEnd)):
                 yield widgets.folding.STOP
 
+    def fold_level(self, block):
+        """Reimplemented to cache the fold level with the tokens of the block.
+
+        The highlighter creates new tokens every time it parses the block.
+
+        """
+        data = block.userData()
+        tokens = getattr(data, 'tokens', None)
+        if tokens is None:
+            return self.compute_fold_level(block)
+        try:
+            cached_tokens, level = data.fold_level
+        except AttributeError:
+            pass
+        else:
+            if cached_tokens is tokens:
+                return level
+        level = self.compute_fold_level(block)
+        data.fold_level = tokens, level
+        return level
+
     def mark(self, block, state=None):
         if state is None:
             try:
@@ -153,7 +153,8 @@ class MusicViewPanel(panel.Panel):
 
     @activate
     def printMusic(self):
-        if self.widget().view.pageCount():
+        view = self.widget().view
+        if view.pageCount():
             # warn about printing directly with cups on Mac
             s = QSettings()
             if (s.value("printing/directcups",
@@ -173,7 +174,7 @@ class MusicViewPanel(panel.Panel):
                     QMessageBox.Yes | QMessageBox.No)
                 if result == QMessageBox.No:
                     return
-            self.widget().view.print()
+            view.print()
 
     @activate
     def jumpToCursor(self):
@@ -200,10 +201,11 @@ class MusicViewPanel(panel.Panel):
             self.actionCollection.music_sync_cursor.isChecked())
 
     def copyImage(self):
-        page, rect = self.widget().view.rubberband().selectedPage()
+        view = self.widget().view
+        page, rect = view.rubberband().selectedPage()
         if not page:
             return
-        filename = self.widget().view.document().filename()
+        filename = view.document().filename()
         import copy2image
         copy2image.copy_image(self, page, rect, filename)
 
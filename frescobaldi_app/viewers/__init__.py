@@ -183,7 +183,8 @@ class AbstractViewPanel(panel.Panel):
 
     @activate
     def printMusic(self):
-        if self.widget().view.pageCount():
+        view = self.widget().view
+        if view.pageCount():
             # warn about printing directly with cups on Mac
             s = QSettings()
             if (s.value("printing/directcups",
@@ -203,7 +204,7 @@ class AbstractViewPanel(panel.Panel):
                     QMessageBox.Yes | QMessageBox.No)
                 if result == QMessageBox.No:
                     return
-            self.widget().view.print()
+            view.print()
 
     @activate
     def jumpToCursor(self):
@@ -233,10 +234,11 @@ class AbstractViewPanel(panel.Panel):
         userguide.show(self.viewerName())
 
     def copyImage(self):
-        page, rect = self.widget().view.rubberband().selectedPage()
+        view = self.widget().view
+        page, rect = view.rubberband().selectedPage()
         if not page:
             return
-        filename = self.widget().view.document().filename()
+        filename = view.document().filename()
         import copy2image
         copy2image.copy_image(self, page, rect, filename)
 
@@ -256,7 +258,7 @@ class AbstractViewPanel(panel.Panel):
         current_filename = current_viewer_doc.filename() if current_viewer_doc else None
         current_editor_document = self.mainwindow().currentDocument().url().toLocalFile()
         directory = os.path.dirname(current_filename or current_editor_document or app.basedir())
-        filenames = QFileDialog().getOpenFileNames(self, caption, directory, '*.pdf',)[0]
+        filenames = QFileDialog.getOpenFileNames(self, caption, directory, '*.pdf')[0]
         if filenames:
             # TODO: This has to be generalized too
             self.actionCollection.viewer_document_select.loadFiles(filenames)
@@ -129,22 +129,28 @@ class AbstractViewerToolbar(QWidget):
         """Add different zoomer actions."""
         t = self.main_toolbar
         ac = self.actionCollection
-        t.addAction(ac.viewer_zoom_in)
-        t.addAction(ac.viewer_zoom_combo)
-        t.addAction(ac.viewer_zoom_out)
-        t.addAction(ac.viewer_magnifier)
+        t.addActions([
+            ac.viewer_zoom_in,
+            ac.viewer_zoom_combo,
+            ac.viewer_zoom_out,
+            ac.viewer_magnifier,
+        ])
 
     def addPagerActions(self):
         """Add navigational actions."""
         t = self.main_toolbar
         ac = self.actionCollection
-        t.addAction(ac.viewer_prev_page)
-        t.addAction(ac.viewer_pager)
-        t.addAction(ac.viewer_next_page)
+        t.addActions([
+            ac.viewer_prev_page,
+            ac.viewer_pager,
+            ac.viewer_next_page,
+        ])
 
     def addRotationActions(self):
         """Add rotation actions."""
         t = self.main_toolbar
         ac = self.actionCollection
-        t.addAction(ac.viewer_rotate_left)
-        t.addAction(ac.viewer_rotate_right)
+        t.addActions([
+            ac.viewer_rotate_left,
+            ac.viewer_rotate_right,
+        ])
@@ -44,7 +44,8 @@ information.
 
 import collections
 
-from PyQt5.QtCore import QEvent, QObject, QPoint, QRect, QSize, Qt, QTimer
+from PyQt5.QtCore import (
+    QEvent, QObject, QPoint, QRect, QRectF, QSize, Qt, QTimer)
 from PyQt5.QtGui import QPainter, QPalette
 from PyQt5.QtWidgets import QWidget
 
@@ -83,14 +84,24 @@ class LinePainter(QObject):
         edit.paintEvent(ev)
         painter = QPainter(obj)
         offset = edit.contentOffset()
-        for block in visible_blocks(edit, ev.rect()):
+        rect = ev.rect()
+        x1, x2 = rect.left(), rect.right()
+        block = edit.firstVisibleBlock()
+        # visible blocks are laid out without gaps, so only the geometry
+        # of the first block is needed, the others follow by their height
+        top = edit.blockBoundingGeometry(block).translated(offset).top()
+        while block.isValid():
             n = block.next()
-            if n.isValid() and not n.isVisible():
-                # draw a line
-                y = edit.blockBoundingGeometry(block).translated(offset).bottom() - 1
-                x1 = ev.rect().left()
-                x2 = ev.rect().right()
-                painter.drawLine(x1, y, x2, y)
+            if block.isVisible():
+                if top >= rect.bottom():
+                    break
+                bottom = top + edit.blockBoundingRect(block).height()
+                if bottom >= rect.top() and n.isValid() and not n.isVisible():
+                    # draw a line
+                    y = bottom - 1
+                    painter.drawLine(x1, y, x2, y)
+                top = bottom
+            block = n
         return True
 
 
@@ -112,13 +123,23 @@ class Folder(QObject):
     on a later block, you should disable caching by setting the
     cache_depth_lines instance (or class) attribute to zero.
 
+    The result of fold_level() is also cached for every block, until the
+    document changes at or before that block, or invalidate_depth_cache() is
+    called for that block or an earlier one. If the fold_events() of a block
+    can change without the document changing, either call
+    invalidate_depth_cache() or set the cache_fold_levels attribute to False.
+
     """
     # cache depth() for every n lines (0=disable)
     cache_depth_lines = 20
 
+    # cache fold_level() for every block
+    cache_fold_levels = True
+
     def __init__(self, doc):
         QObject.__init__(self, doc)
         self._depth_cache = []      # cache result of depth()
+        self._level_cache = []      # cache result of fold_level(), per block
         self._all_visible = None    # True when all are certainly visible
         doc.contentsChange.connect(self.slot_contents_change)
         self._timer = QTimer(singleShot=True, timeout=self.check_consistency)
@@ -137,13 +158,15 @@ class Folder(QObject):
         """Called when the document changes.
 
         Provides limited support for unhiding regions when the user types
-        text in it, and deletes the depth() cache for lines from position.
+        text in it, and deletes the depth() and fold_level() caches for lines
+        from position.
 
         """
         block = self.document().findBlock(position)
         if self.cache_depth_lines:
             chunk = block.blockNumber() // self.cache_depth_lines
             del self._depth_cache[chunk:]
+        del self._level_cache[block.blockNumber():]
 
         if self._all_visible:
             return
@@ -170,10 +193,15 @@ class Folder(QObject):
         self._timer.start(250 + self.document().blockCount())
 
     def invalidate_depth_cache(self, block):
-        """Makes sure the depth is recomputed from the specified block."""
+        """Makes sure the depth is recomputed from the specified block.
+
+        The cached fold levels from that block on are also discarded.
+
+        """
         if self.cache_depth_lines:
             chunk = block.blockNumber() // self.cache_depth_lines
             del self._depth_cache[chunk:]
+        del self._level_cache[block.blockNumber():]
 
     def check_consistency(self):
         """Called some time after the last document change.
@@ -267,26 +295,55 @@ class Folder(QObject):
         stop is the number (negative!) of fold-levels that end in that block,
         start is the number of fold-levels that start in that block.
 
+        The result of compute_fold_level() is cached if the cache_fold_levels
+        instance (or class) attribute is True.
+
+        """
+        if not self.cache_fold_levels:
+            return self.compute_fold_level(block)
+        n = block.blockNumber()
+        cache = self._level_cache
+        if n < len(cache):
+            level = cache[n]
+            if level is not None:
+                return level
+        else:
+            cache.extend([None] * (n + 1 - len(cache)))
+        level = cache[n] = self.compute_fold_level(block)
+        return level
+
+    def compute_fold_level(self, block):
+        """Computes the Level(stop, start) for the block.
+
         This methods uses fold_events() to get the information, it discards
         folding regions that start and stop on the same text line.
 
         """
-        start, stop = 0, 0
+        if type(self).fold_events is Folder.fold_events:
+            # the default fold_events(): if the line only has braces of one
+            # kind, their order does not matter and they can simply be counted
+            text = block.text()
+            opens, closes = text.count('{'), text.count('}')
+            if not closes:
+                return Level(0, opens)
+            elif not opens:
+                return Level(-closes, 0)
+        # the lowest the count gets are the regions that stop,
+        # the remainder are the regions that start
+        count = lowest = 0
         for e in self.fold_events(block):
-            if e is START:
-                start += 1
-            elif start:
-                start -= 1
-            else:
-                stop -= 1
-        return Level(stop, start)
+            count += e
+            if count < lowest:
+                lowest = count
+        return Level(lowest, count - lowest)
 
     def depth(self, block):
         """Return the number of active regions at the start of this block.
 
-        The default implementation simply counts all the fold_events from
+        The default implementation simply counts all the fold levels from
         the beginning of the document, using caching if the cache_depth_lines
-        instance attribute is set to a value > 0.
+        instance attribute is set to a value > 0. The (cached) fold_level() is
+        used, which has the same sum as the fold_events() of a block.
 
         """
         depth = 0
@@ -304,12 +361,12 @@ class Folder(QObject):
                         depth = self._depth_cache[-1]
                         last = block.document().findBlockByNumber(len(self._depth_cache) * self.cache_depth_lines)
                     while last < target:
-                        depth += sum(self.fold_events(last))
+                        depth += sum(self.fold_level(last))
                         last = last.next()
                         if last.blockNumber() % self.cache_depth_lines == 0:
                             self._depth_cache.append(depth)
         while last < block:
-            depth += sum(self.fold_events(last))
+            depth += sum(self.fold_level(last))
             last = last.next()
         return depth
 
@@ -389,18 +446,21 @@ class Folder(QObject):
         r = self.region(block, depth)
         if not r:
             return
+        fold_level = self.fold_level
+        start_num = r.start.blockNumber()
+        end_num = r.end.blockNumber()
         blocks = cursortools.forwards(r.start, r.end)
         for block in blocks:
             # is there a sub-region? then skip if marked as collapsed
-            if block not in r:
-                l = self.fold_level(block)
+            if start_num < block.blockNumber() < end_num:
+                l = fold_level(block)
                 if l.start:
                     if full:
                         self.mark(block, False)
                     elif self.mark(block):
                         count = l.start
                         for b in blocks:
-                            l = self.fold_level(b)
+                            l = fold_level(b)
                             if count <= -l.stop:
                                 break
                             count += sum(l)
@@ -547,24 +607,32 @@ class FoldingArea(QWidget):
         folder = self.folder()
         depth = folder.depth(block)
         offset = edit.contentOffset()
+        top, bottom = ev.rect().top(), ev.rect().bottom()
+        width = self.width()
+        blockBoundingRect = edit.blockBoundingRect
+        fold_level = folder.fold_level
+        # compute the other block positions using their heights
+        y = edit.blockBoundingGeometry(block).translated(offset).top()
         while block.isValid():
             next_block = block.next()
-            level = folder.fold_level(block)
-            count = sum(level)
-            if block.isVisible():
-                rect = edit.blockBoundingGeometry(block).translated(offset).toRect()
-                if rect.top() > ev.rect().bottom():
+            visible = block.isVisible()
+            if visible:
+                height = blockBoundingRect(block).height()
+                rect = QRectF(0, y, width, height).toRect()
+                y += height
+                if rect.top() > bottom:
                     break
-                elif rect.bottom() >= ev.rect().top():
-                    rect.setX(0)
-                    rect.setWidth(self.width())
+            level = fold_level(block)
+            count = sum(level)
+            if visible:
+                if rect.bottom() >= top:
                     # draw a folder indicator
                     if level.start:
                         folded = next_block.isValid() and not next_block.isVisible()
                         if folded:
                             indicator = OPEN
                             while next_block.isValid() and not next_block.isVisible():
-                                count += sum(folder.fold_events(next_block))
+                                count += sum(fold_level(next_block))
                                 next_block = next_block.next()
                         else:
                             indicator = CLOSE